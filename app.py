@@ -4,14 +4,16 @@ from __future__ import annotations
 import os
 import textwrap
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 import streamlit as st
 
-from db import MongoCaseRepository, RepositoryError
+from db import DETAIL_FIELDS, MongoCaseRepository, RepositoryError
 from sample_data import SAMPLE_CASES
 
 
+@lru_cache(maxsize=2048)
 def _format_date(value: Optional[str]) -> str:
     """Return a human readable date string."""
     if not value:
@@ -22,7 +24,30 @@ def _format_date(value: Optional[str]) -> str:
         return value
 
 
-def _render_case(case: Dict[str, Any]) -> None:
+@st.cache_data(ttl=300, show_spinner=False)
+def _load_case_detail(_repository: MongoCaseRepository, case_id: str) -> Dict[str, Any]:
+    return _repository.get_case_detail(case_id)
+
+
+def _render_case_details(details: Dict[str, Any]) -> None:
+    """Render the reasoning and outcome sections of a case."""
+    if reasoning := details.get("reasoning"):
+        with st.expander("Reasoning", expanded=False):
+            for key, value in reasoning.items():
+                title = key.replace("_", " ").title()
+                st.markdown(f"**{title}**\n\n{textwrap.fill(value, 100)}")
+
+    if outcome := details.get("outcome"):
+        with st.expander("Outcome", expanded=False):
+            if decision := outcome.get("decision"):
+                st.markdown(f"**Decision**: {decision}")
+            if directions := outcome.get("directions"):
+                st.markdown("**Directions**:")
+                for direction in directions:
+                    st.markdown(f"- {direction}")
+
+
+def _render_case(case: Dict[str, Any], repository: MongoCaseRepository) -> None:
     """Render a single case card."""
     title = case.get("case_title", "Untitled case")
     subtitle = f"{case.get('court', 'Unknown court')} · {_format_date(case.get('judgment_date'))}"
@@ -41,20 +66,15 @@ def _render_case(case: Dict[str, Any]) -> None:
                 for issue in issues:
                     st.markdown(f"- {issue}")
 
-        if reasoning := case.get("reasoning"):
-            with st.expander("Reasoning", expanded=False):
-                for key, value in reasoning.items():
-                    title = key.replace("_", " ").title()
-                    st.markdown(f"**{title}**\n\n{textwrap.fill(value, 100)}")
-
-        if outcome := case.get("outcome"):
-            with st.expander("Outcome", expanded=False):
-                if decision := outcome.get("decision"):
-                    st.markdown(f"**Decision**: {decision}")
-                if directions := outcome.get("directions"):
-                    st.markdown("**Directions**:")
-                    for direction in directions:
-                        st.markdown(f"- {direction}")
+        if any(field in case for field in DETAIL_FIELDS):
+            _render_case_details(case)
+        elif case_id := case.get("_id"):
+            # Search results omit the heavy fields; fetch them only on request.
+            if st.toggle("Show reasoning and outcome", key=f"details-{case_id}"):
+                try:
+                    _render_case_details(_load_case_detail(repository, case_id))
+                except RepositoryError as exc:  # pragma: no cover - depends on runtime
+                    st.error(str(exc))
 
         if bench := case.get("bench"):
             st.caption("Bench: " + ", ".join(bench))
@@ -65,16 +85,40 @@ def _render_user_message(query: str) -> None:
         st.write(query)
 
 
+def _render_results(results: List[Dict[str, Any]], repository: MongoCaseRepository) -> None:
+    if not results:
+        with st.chat_message("assistant"):
+            st.write("No results from MongoDB. Showing sample cases instead.")
+        for case in SAMPLE_CASES:
+            _render_case(case, repository)
+    else:
+        for case in results:
+            _render_case(case, repository)
+
+
+@st.cache_resource(show_spinner=False)
 def _load_repository() -> MongoCaseRepository:
+    """Return the process-wide repository so its connection pool survives reruns."""
     mongo_uri = os.environ.get("MONGODB_URI", "mongodb://localhost:27017")
     database = os.environ.get("MONGODB_DB", "law")
     collection = os.environ.get("MONGODB_COLLECTION", "cases")
-    return MongoCaseRepository(uri=mongo_uri, database=database, collection=collection)
+    return MongoCaseRepository(
+        uri=mongo_uri,
+        database=database,
+        collection=collection,
+        ann_index_path=os.environ.get("FAISS_INDEX_PATH"),
+    )
+
+
+@st.cache_data(ttl=300, max_entries=256, show_spinner=False)
+def _cached_search(_repository: MongoCaseRepository, query: str) -> List[Dict[str, Any]]:
+    # Raised errors are not cached, so a failed search is retried next time.
+    return _repository.search_cases(query)
 
 
 def _search_cases(repository: MongoCaseRepository, query: str) -> List[Dict[str, Any]]:
     try:
-        return repository.search_cases(query)
+        return _cached_search(repository, query)
     except RepositoryError as exc:  # pragma: no cover - defensive programming
         st.error(str(exc))
         return []
@@ -95,15 +139,13 @@ def main() -> None:
     if query:
         _render_user_message(query)
         results = _search_cases(repository, query)
-        if not results:
-            with st.chat_message("assistant"):
-                st.write("No results from MongoDB. Showing sample cases instead.")
-            for case in SAMPLE_CASES:
-                _render_case(case)
-        else:
-            for case in results:
-                _render_case(case)
+        _render_results(results, repository)
         st.session_state.history.append({"query": query, "results": results})
+    elif history := st.session_state.history:
+        # Widget interactions rerun the script without a new chat message;
+        # keep showing the latest answer so loaded details stay visible.
+        _render_user_message(history[-1]["query"])
+        _render_results(history[-1]["results"], repository)
 
     # Display history in sidebar
     with st.sidebar:
@@ -0,0 +1,27 @@
+"""Precompute rerank embeddings (and optionally a FAISS index) for stored cases."""
+from __future__ import annotations
+
+import os
+
+from db import MongoCaseRepository
+
+
+def main() -> None:
+    repository = MongoCaseRepository(
+        uri=os.environ.get("MONGODB_URI", "mongodb://localhost:27017"),
+        database=os.environ.get("MONGODB_DB", "law"),
+        collection=os.environ.get("MONGODB_COLLECTION", "cases"),
+    )
+    index_path = os.environ.get("FAISS_INDEX_PATH")
+    try:
+        updated = repository.build_reranker_index()
+        print(f"Stored rerank embeddings for {updated} cases.")
+        if index_path:
+            indexed = repository.build_ann_index(index_path)
+            print(f"Wrote FAISS index with {indexed} cases to {index_path}.")
+    finally:
+        repository.close()
+
+
+if __name__ == "__main__":
+    main()
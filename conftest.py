@@ -0,0 +1 @@
+"""Pytest configuration: makes the top-level modules importable from tests/."""
@@ -1,18 +1,231 @@
 """MongoDB repository helpers for the Streamlit app."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 
-from pymongo import MongoClient, errors
+import numpy as np
+import torch
+from bson import Binary, ObjectId
+from pymongo import TEXT, MongoClient, UpdateOne, errors
 from sentence_transformers import SentenceTransformer
 
+try:  # Optional: approximate nearest-neighbour retrieval.
+    import faiss
+except ImportError:  # pragma: no cover - depends on installed extras
+    faiss = None
+
+TEXT_INDEX_NAME = "case_search_text"
+TEXT_INDEX_FIELDS = (
+    "case_title",
+    "issues",
+    "search_metadata.summary",
+    "court",
+    "bench",
+    "citation",
+)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_CACHE_SIZE = 4096
+DOCUMENT_TEXT_CACHE_SIZE = 10000
+SCORE_CACHE_TTL_SECONDS = 15 * 60
+# Normalised embeddings lie in [-1, 1]; int8 codes use a fixed 1/127 scale.
+QUANTIZATION_SCALE = 127
+# Once a length bucket holds MIN_LENGTH_BUCKET_SIZE texts, a new one starts
+# when the next text is more than LENGTH_BUCKET_RATIO times its shortest.
+# Smaller candidate sets stay in one forward pass, where per-call overhead
+# outweighs the padding saved by splitting.
+LENGTH_BUCKET_RATIO = 2
+MIN_LENGTH_BUCKET_SIZE = 16
+# Candidate count from which the numba top-k kernel beats a full argsort.
+TOPK_KERNEL_MIN_CANDIDATES = 16
+# Precomputed by build_reranker_index() so searches only embed the query.
+RERANK_TEXT_FIELD = "_rerank_text"
+RERANK_VECTOR_FIELD = "_rerank_vec"
+# Large nested fields that search results omit; see get_case_detail().
+DETAIL_FIELDS = ("reasoning", "outcome")
+SEARCH_PROJECTION = {
+    "case_title": 1,
+    "court": 1,
+    "judgment_date": 1,
+    "citation": 1,
+    "bench": 1,
+    "issues": 1,
+    "search_metadata": 1,
+}
+# FAISS IVF-PQ settings: 48 sub-quantisers of 8 dims each with 4-bit
+# fast-scan codes. Small corpora use an exact flat index instead.
+ANN_MAX_LISTS = 256
+ANN_POINTS_PER_LIST = 39
+ANN_MIN_TRAINING_POINTS = 1000
+ANN_PQ_DESCRIPTION = "PQ48x4fs"
+ANN_NPROBE = 16
+# Law-report citations: "2023 0 CJ(SC) 242" or "(2019) 5 SCC 1".
+CITATION_PATTERN = re.compile(
+    r"\d{4}\s+\d+\s+[A-Z][A-Z.]*\s*\([A-Z][A-Z.]*\)\s*\d+"
+    r"|\(\d{4}\)\s*\d+\s+[A-Z][A-Z.]*\s+\d+"
+)
+# Short queries may be exact bench or citation lookups.
+MAX_EXACT_MATCH_WORDS = 3
+
 
 class RepositoryError(RuntimeError):
     """Raised when the Mongo repository cannot be accessed."""
 
 
+class _LRUCache:
+    """Small thread-safe LRU mapping shared by concurrent Streamlit sessions."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class _TTLCache:
+    """Bounded mapping whose entries expire ``ttl`` seconds after insertion."""
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Every entry lives for the same ttl, so insertion order is expiry order.
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None)
+            while self._entries and next(iter(self._entries.values()))[0] < now:
+                self._entries.popitem(last=False)
+            while len(self._entries) >= self.maxsize:
+                self._entries.popitem(last=False)
+            self._entries[key] = (now + self.ttl, value)
+
+
+_document_text_cache = _LRUCache(DOCUMENT_TEXT_CACHE_SIZE)
+_query_vector_cache = _LRUCache(EMBEDDING_CACHE_SIZE)
+_document_vector_cache = _LRUCache(EMBEDDING_CACHE_SIZE)
+_score_cache = _TTLCache(SCORE_CACHE_TTL_SECONDS, EMBEDDING_CACHE_SIZE)
+# Built once on first use; the lock stops the query-encoding worker and the
+# rerank thread from both loading it on a cold start.
+_embedding_model: Optional[SentenceTransformer] = None
+_embedding_model_lock = threading.Lock()
+
+
+@dataclass
+class DocBatch:
+    """Column-oriented view of a batch of case documents.
+
+    Each field holds one entry per document, already reduced to the strings
+    that feed the rerank text, so texts can be built with a single zip.
+    """
+
+    titles: List[str]
+    courts: List[str]
+    citations: List[str]
+    benches: List[List[str]]
+    issues: List[List[str]]
+    summaries: List[str]
+    reasoning_values: List[List[str]]
+    outcomes: List[List[str]]
+
+    @classmethod
+    def from_documents(cls, documents: List[Dict[str, Any]]) -> "DocBatch":
+        return cls(
+            titles=[_text_value(document.get("case_title")) for document in documents],
+            courts=[_text_value(document.get("court")) for document in documents],
+            citations=[_text_value(document.get("citation")) for document in documents],
+            benches=[_text_items(document.get("bench")) for document in documents],
+            issues=[_text_items(document.get("issues")) for document in documents],
+            summaries=[
+                _text_value((document.get("search_metadata") or {}).get("summary"))
+                for document in documents
+            ],
+            reasoning_values=[
+                _text_items(_dict_values(document.get("reasoning")))
+                for document in documents
+            ],
+            outcomes=[_outcome_parts(document.get("outcome")) for document in documents],
+        )
+
+
+def build_rerank_texts(batch: DocBatch) -> List[str]:
+    """Join each document's columns into the text embedded for reranking."""
+    return [
+        " ".join(
+            part
+            for part in (title, court, citation, *bench, *issues, summary, *reasoning, *outcome)
+            if part
+        )
+        for title, court, citation, bench, issues, summary, reasoning, outcome in zip(
+            batch.titles,
+            batch.courts,
+            batch.citations,
+            batch.benches,
+            batch.issues,
+            batch.summaries,
+            batch.reasoning_values,
+            batch.outcomes,
+        )
+    ]
+
+
+def _text_value(value: Any) -> str:
+    return str(value) if value else ""
+
+
+def _text_items(values: Any) -> List[str]:
+    if not isinstance(values, list):
+        return []
+    return [str(value) for value in values if value]
+
+
+def _dict_values(mapping: Any) -> Optional[List[Any]]:
+    return list(mapping.values()) if isinstance(mapping, dict) else None
+
+
+def _outcome_parts(outcome: Any) -> List[str]:
+    if not isinstance(outcome, dict):
+        return []
+    decision = _text_value(outcome.get("decision"))
+    directions = _text_items(outcome.get("directions"))
+    return [decision, *directions] if decision else directions
+
+
 @dataclass
 class MongoCaseRepository:
     """Repository that wraps MongoDB access for legal case documents."""
@@ -21,24 +234,49 @@ class MongoCaseRepository:
     database: str
     collection: str
     limit: int = 5
+    ann_index_path: Optional[str] = None
+    max_pool_size: int = 10
+    min_pool_size: int = 2
 
     _client: Optional[MongoClient] = None
     _collection = None
+    # The app shares one repository across Streamlit sessions and threads.
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
     def _connect(self) -> None:
-        if self._client is not None:
-            return
+        with self._lock:
+            if self._collection is not None:
+                return
+            self._open_client()
 
+    def _open_client(self) -> None:
         try:
-            self._client = MongoClient(self.uri, serverSelectionTimeoutMS=3000)
+            self._client = MongoClient(
+                self.uri,
+                serverSelectionTimeoutMS=3000,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+            )
             # Trigger server selection to fail fast when the DB is unavailable.
             self._client.admin.command("ping")
             self._collection = self._client[self.database][self.collection]
+            self._ensure_text_index()
         except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
+            self.close()
             raise RepositoryError(
                 "Could not connect to MongoDB. Please check your connection details."
             ) from exc
 
+    def _ensure_text_index(self) -> None:
+        try:
+            self._collection.create_index(
+                [(field, TEXT) for field in TEXT_INDEX_FIELDS],
+                name=TEXT_INDEX_NAME,
+            )
+        except errors.OperationFailure:
+            # A collection holds at most one text index; keep an existing one.
+            pass
+
     @property
     def collection_handle(self):
         if self._collection is None:
@@ -46,100 +284,227 @@ class MongoCaseRepository:
         return self._collection
 
     def search_cases(self, query: str) -> List[Dict[str, Any]]:
-        """Search cases in MongoDB using a text index or regex fallback."""
+        """Search cases via the FAISS index if available, else MongoDB text search."""
         if not query:
             return []
 
         collection = self.collection_handle
+        literal = _is_literal_query(query)
+        # Short queries may be exact name or citation lookups, which only the
+        # text index answers precisely; they try it before the FAISS index.
+        short = len(query.split()) <= MAX_EXACT_MATCH_WORDS
+
+        ann_index = _load_ann_index(self.ann_index_path) if self.ann_index_path else None
+        if ann_index is not None and not (literal or short):
+            documents = self._ann_search(collection, query, ann_index)
+            if documents is not None:
+                return documents
+
+        # Encode the query while MongoDB serves the lexical candidates. Short
+        # queries wait for the results before paying for the model.
+        query_vector = None
+        if not (literal or short):
+            query_vector = _get_executor().submit(_encode_query, query)
 
         text_projection = {
             "score": {"$meta": "textScore"},
-            "case_title": 1,
-            "court": 1,
-            "judgment_date": 1,
-            "citation": 1,
-            "bench": 1,
-            "issues": 1,
-            "reasoning": 1,
-            "outcome": 1,
-            "search_metadata": 1,
+            **SEARCH_PROJECTION,
+            RERANK_VECTOR_FIELD: 1,
         }
 
-        documents: List[Dict[str, Any]] = []
-        run_fallback = False
-
         try:
-            cursor = collection.find(
+            raw_documents = collection.find(
                 {"$text": {"$search": query}},
                 text_projection,
                 sort=[("score", {"$meta": "textScore"})],
                 limit=self.limit,
-            )
-            documents = [
-                self._normalise_document(document)
-                for document in cursor
-            ]
-        except errors.OperationFailure:
-            run_fallback = True
+                batch_size=self.limit,
+            ).to_list(self.limit)
+            documents = [self._normalise_document(document) for document in raw_documents]
         except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
             raise RepositoryError("Failed to run search query against MongoDB.") from exc
 
-        if run_fallback or len(documents) < self.limit:
-            fallback_documents = self._fallback_search(collection, query, text_projection)
-            documents = self._merge_documents(documents, fallback_documents)
+        stored_vectors = [document.pop(RERANK_VECTOR_FIELD, None) for document in documents]
+
+        # Literal lookups are already best ordered by MongoDB; skip the model.
+        if literal or self._is_exact_match(query, documents):
+            return documents[: self.limit]
+        if short and ann_index is not None:
+            # No judge or citation matched, so the short query is topical.
+            ann_documents = self._ann_search(collection, query, ann_index)
+            if ann_documents is not None:
+                return ann_documents
+        # A single hit has nothing to reorder.
+        if len(documents) <= 1:
+            return documents
+        if query_vector is None:
+            query_vector = _get_executor().submit(_encode_query, query)
 
-        reranked = self._semantic_rerank(query, documents)
+        reranked = self._semantic_rerank(query, documents, stored_vectors, query_vector)
         return reranked[: self.limit]
 
-    def _fallback_search(
+    def _ann_search(
         self,
         collection,
         query: str,
-        projection: Dict[str, Any],
-    ) -> List[Dict[str, Any]]:
-        fallback_projection = dict(projection)
-        fallback_projection.pop("score", None)
-
-        regex_filter = {
-            "$or": [
-                {"case_title": {"$regex": query, "$options": "i"}},
-                {"issues": {"$regex": query, "$options": "i"}},
-                {"search_metadata.summary": {"$regex": query, "$options": "i"}},
-                {"court": {"$regex": query, "$options": "i"}},
-                {"bench": {"$regex": query, "$options": "i"}},
-                {"citation": {"$regex": query, "$options": "i"}},
-            ]
-        }
+        ann_index: Tuple[Any, List[str]],
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return the nearest cases by embedding, or None to use text search."""
+        index, identifiers = ann_index
+        try:
+            query_vector = _encode_query(query)
+        except Exception:  # pragma: no cover - fallback when embeddings fail
+            return None
+        if query_vector.shape[-1] != index.d:
+            # Index built with a different embedding model; use text search.
+            return None
+
+        _, positions = index.search(
+            np.ascontiguousarray(query_vector, dtype=np.float32).reshape(1, -1),
+            self.limit,
+        )
+        ranked_ids = [identifiers[position] for position in positions[0] if position >= 0]
+        if not ranked_ids:
+            return []
 
-        cursor = collection.find(regex_filter, fallback_projection, limit=self.limit)
-        return [self._normalise_document(document) for document in cursor]
+        try:
+            raw_documents = collection.find(
+                {"_id": {"$in": [_as_document_id(case_id) for case_id in ranked_ids]}},
+                SEARCH_PROJECTION,
+                batch_size=self.limit,
+            ).to_list(len(ranked_ids))
+            documents = {
+                document["_id"]: document
+                for document in map(self._normalise_document, raw_documents)
+            }
+        except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
+            raise RepositoryError("Failed to run search query against MongoDB.") from exc
 
-    def _merge_documents(
-        self,
-        primary: List[Dict[str, Any]],
-        secondary: List[Dict[str, Any]],
-    ) -> List[Dict[str, Any]]:
-        if not secondary:
-            return primary
-
-        merged = list(primary)
-        seen: Set[str] = {
-            document["_id"]
-            for document in primary
-            if isinstance(document.get("_id"), str)
+        return [documents[case_id] for case_id in ranked_ids if case_id in documents]
+
+    def get_case_detail(self, case_id: str) -> Dict[str, Any]:
+        """Fetch the fields omitted from search results for a single case."""
+        collection = self.collection_handle
+
+        try:
+            document = collection.find_one(
+                {"_id": _as_document_id(case_id)},
+                {field: 1 for field in DETAIL_FIELDS},
+            )
+        except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
+            raise RepositoryError("Failed to load case details from MongoDB.") from exc
+
+        return self._normalise_document(document)
+
+    def _get_case_details(self, case_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch the fields omitted from search results for several cases."""
+        if not case_ids:
+            return {}
+
+        try:
+            raw_documents = self.collection_handle.find(
+                {"_id": {"$in": [_as_document_id(case_id) for case_id in case_ids]}},
+                {field: 1 for field in DETAIL_FIELDS},
+                batch_size=len(case_ids),
+            ).to_list(len(case_ids))
+        except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
+            raise RepositoryError("Failed to load case details from MongoDB.") from exc
+
+        return {
+            document["_id"]: document
+            for document in map(self._normalise_document, raw_documents)
         }
 
-        for document in secondary:
-            identifier = document.get("_id")
-            if isinstance(identifier, str):
-                if identifier in seen:
-                    continue
-                seen.add(identifier)
-            elif document in merged:
-                continue
-            merged.append(document)
+    def build_reranker_index(self, batch_size: int = 64) -> int:
+        """Store each case's rerank text and int8 embedding on the document.
 
-        return merged
+        Returns the number of documents updated. Re-run after ingesting or
+        editing cases.
+        """
+        collection = self.collection_handle
+        updated = 0
+
+        try:
+            cursor = collection.find(
+                {},
+                {RERANK_TEXT_FIELD: 0, RERANK_VECTOR_FIELD: 0},
+                batch_size=batch_size,
+            )
+            batch: List[Dict[str, Any]] = []
+            for document in cursor:
+                batch.append(document)
+                if len(batch) == batch_size:
+                    updated += self._write_rerank_fields(collection, batch)
+                    batch = []
+            if batch:
+                updated += self._write_rerank_fields(collection, batch)
+        except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
+            raise RepositoryError("Failed to build the rerank index in MongoDB.") from exc
+
+        return updated
+
+    def build_ann_index(self, path: str) -> int:
+        """Build a FAISS index over the stored rerank embeddings and save it.
+
+        Run build_reranker_index() first. The case ids are written next to
+        the index as ``<path>.ids.json``. Returns the number of indexed cases.
+        """
+        if faiss is None:
+            raise RepositoryError("Install faiss-cpu to build the ANN index.")
+
+        collection = self.collection_handle
+        identifiers: List[str] = []
+        codes: List[np.ndarray] = []
+
+        try:
+            cursor = collection.find(
+                {RERANK_VECTOR_FIELD: {"$exists": True}},
+                {RERANK_VECTOR_FIELD: 1},
+                batch_size=1000,
+            )
+            for document in cursor:
+                identifiers.append(str(document["_id"]))
+                codes.append(np.frombuffer(document[RERANK_VECTOR_FIELD], dtype=np.int8))
+        except errors.PyMongoError as exc:  # pragma: no cover - depends on runtime
+            raise RepositoryError("Failed to read rerank embeddings from MongoDB.") from exc
+
+        if not identifiers:
+            return 0
+
+        vectors = np.stack(codes).astype(np.float32) / QUANTIZATION_SCALE
+        if len(vectors) >= ANN_MIN_TRAINING_POINTS:
+            lists = min(ANN_MAX_LISTS, len(vectors) // ANN_POINTS_PER_LIST)
+            description = f"IVF{lists},{ANN_PQ_DESCRIPTION}"
+        else:
+            description = "Flat"
+
+        index = faiss.index_factory(vectors.shape[1], description, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add(vectors)
+        faiss.write_index(index, path)
+        with open(_ann_ids_path(path), "w", encoding="utf-8") as handle:
+            json.dump(identifiers, handle)
+        return len(identifiers)
+
+    def _write_rerank_fields(self, collection, documents: List[Dict[str, Any]]) -> int:
+        texts = build_rerank_texts(DocBatch.from_documents(documents))
+        codes = _quantize(_encode_texts(texts))
+        collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": document["_id"]},
+                    {
+                        "$set": {
+                            RERANK_TEXT_FIELD: text,
+                            RERANK_VECTOR_FIELD: Binary(code.tobytes()),
+                        }
+                    },
+                )
+                for document, text, code in zip(documents, texts, codes)
+            ],
+            ordered=False,
+        )
+        return len(documents)
 
     def _normalise_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
         if document is None:
@@ -151,65 +516,111 @@ class MongoCaseRepository:
         normalised.pop("score", None)
         return normalised
 
+    def _is_exact_match(self, query: str, documents: List[Dict[str, Any]]) -> bool:
+        """Return True when a short query names a result's citation or judge."""
+        if len(query.split()) > MAX_EXACT_MATCH_WORDS:
+            return False
+
+        needle = query.strip().casefold()
+        for document in documents:
+            citation = document.get("citation")
+            if isinstance(citation, str) and citation.casefold() == needle:
+                return True
+            bench = document.get("bench")
+            if isinstance(bench, list) and any(
+                isinstance(member, str) and member.casefold() == needle
+                for member in bench
+            ):
+                return True
+        return False
+
     def _semantic_rerank(
-        self, query: str, documents: List[Dict[str, Any]]
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        stored_vectors: List[Optional[bytes]],
+        query_vector: "Future[np.ndarray]",
     ) -> List[Dict[str, Any]]:
         if len(documents) <= 1:
             return documents
 
-        try:
-            model = _get_embedding_model()
-            doc_texts = [self._document_to_text(document) for document in documents]
-            query_vector = model.encode(
-                query, convert_to_numpy=True, normalize_embeddings=True
+        query_hash = _content_hash(query)
+        score_keys = [
+            (query_hash, self._score_key(document, stored))
+            for document, stored in zip(documents, stored_vectors)
+        ]
+        cached = [_score_cache.get(key) for key in score_keys]
+        scored = [(score, index) for index, score in enumerate(cached) if score is not None]
+        unscored = [index for index, score in enumerate(cached) if score is None]
+
+        if unscored:
+            # Only documents without a cached score are embedded; those lacking
+            # a precomputed vector are encoded from their (fetched) full text.
+            pending = [index for index in unscored if stored_vectors[index] is None]
+            texts = self._documents_to_texts([documents[index] for index in pending])
+            try:
+                vectors = {
+                    index: np.frombuffer(stored_vectors[index], dtype=np.int8)
+                    for index in unscored
+                    if stored_vectors[index] is not None
+                }
+                if pending:
+                    encoded = _encode_documents(texts, [_content_hash(text) for text in texts])
+                    vectors.update(zip(pending, encoded))
+                # Any unscored document outside this subset's top k is also
+                # outside the overall top k, so only those scores are needed.
+                subset_indices, subset_scores = _top_k_scores(
+                    np.stack([vectors[index] for index in unscored]),
+                    query_vector.result(),
+                    self.limit,
+                )
+            except Exception:  # pragma: no cover - fallback when embeddings fail
+                return documents
+
+            for position, score in zip(subset_indices, subset_scores):
+                _score_cache.put(score_keys[unscored[position]], score)
+                scored.append((score, unscored[position]))
+
+        ranked = sorted(scored, key=lambda item: (-item[0], item[1]))
+        return [documents[index] for _, index in ranked[: self.limit]]
+
+    def _score_key(self, document: Dict[str, Any], stored: Optional[bytes]) -> Hashable:
+        """Identify a document's embedding without building its rerank text."""
+        if stored is not None:
+            return _content_hash(stored)
+        if "_id" in document:
+            # Cases are immutable, like the _id-keyed text memo assumes.
+            return ("_id", document["_id"])
+        return _content_hash(self._documents_to_texts([document])[0])
+
+    def _documents_to_texts(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """Return rerank texts for search results, memoised by ``_id``."""
+        texts: List[Optional[str]] = [
+            _document_text_cache.get(document["_id"]) if "_id" in document else None
+            for document in documents
+        ]
+        missing = [index for index, text in enumerate(texts) if text is None]
+
+        if missing:
+            # Search results omit DETAIL_FIELDS; fetch them so the text matches
+            # the full text that build_reranker_index() embeds.
+            details = self._get_case_details(
+                [documents[index]["_id"] for index in missing if "_id" in documents[index]]
             )
-            document_vectors = model.encode(
-                doc_texts, convert_to_numpy=True, normalize_embeddings=True
+            built = build_rerank_texts(
+                DocBatch.from_documents(
+                    [
+                        {**documents[index], **details.get(documents[index].get("_id"), {})}
+                        for index in missing
+                    ]
+                )
             )
-        except Exception:  # pragma: no cover - fallback when embeddings fail
-            return documents
+            for index, text in zip(missing, built):
+                texts[index] = text
+                if "_id" in documents[index]:
+                    _document_text_cache.put(documents[index]["_id"], text)
 
-        scores = document_vectors @ query_vector
-        ranked = sorted(
-            zip(scores.tolist(), documents),
-            key=lambda item: item[0],
-            reverse=True,
-        )
-        return [document for _, document in ranked]
-
-    def _document_to_text(self, document: Dict[str, Any]) -> str:
-        parts: List[str] = []
-        for key in ("case_title", "court", "citation"):
-            value = document.get(key)
-            if value:
-                parts.append(str(value))
-
-        bench = document.get("bench")
-        if isinstance(bench, list):
-            parts.extend(str(member) for member in bench if member)
-
-        issues = document.get("issues")
-        if isinstance(issues, list):
-            parts.extend(str(issue) for issue in issues if issue)
-
-        summary = document.get("search_metadata", {}).get("summary")
-        if summary:
-            parts.append(str(summary))
-
-        reasoning = document.get("reasoning")
-        if isinstance(reasoning, dict):
-            parts.extend(str(text) for text in reasoning.values() if text)
-
-        outcome = document.get("outcome")
-        if isinstance(outcome, dict):
-            decision = outcome.get("decision")
-            if decision:
-                parts.append(str(decision))
-            directions = outcome.get("directions")
-            if isinstance(directions, list):
-                parts.extend(str(direction) for direction in directions if direction)
-
-        return " ".join(parts)
+        return texts
 
     def close(self) -> None:
         if self._client is not None:
@@ -218,7 +629,263 @@ class MongoCaseRepository:
             self._collection = None
 
 
-@lru_cache(maxsize=1)
 def _get_embedding_model() -> SentenceTransformer:
-    """Return a cached embedding model for semantic similarity."""
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    """Return the shared embedding model, loading it on first use."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = _load_embedding_model()
+    return _embedding_model
+
+
+def _load_embedding_model() -> SentenceTransformer:
+    """Load the embedding model for semantic similarity.
+
+    Prefers the ONNX Runtime backend, which is considerably faster on CPU,
+    and falls back to PyTorch when the ONNX extras are not installed. The
+    PyTorch model runs in bfloat16 on CPUs with AVX-512 BF16 support.
+    """
+    try:
+        return SentenceTransformer(
+            EMBEDDING_MODEL_NAME,
+            backend="onnx",
+            model_kwargs={"provider": "CPUExecutionProvider"},
+        )
+    except Exception:  # pragma: no cover - depends on installed extras
+        pass
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    if _cpu_supports_bf16():
+        model = model.to(torch.bfloat16)
+    return model
+
+
+def _cpu_supports_bf16() -> bool:
+    check = getattr(torch.cpu, "_is_avx512_bf16_supported", None)
+    try:
+        return bool(check and check())
+    except RuntimeError:  # pragma: no cover - depends on the torch build
+        return False
+
+
+def _as_document_id(case_id: str) -> Any:
+    return ObjectId(case_id) if ObjectId.is_valid(case_id) else case_id
+
+
+def _ann_ids_path(index_path: str) -> str:
+    return f"{index_path}.ids.json"
+
+
+@lru_cache(maxsize=4)
+def _load_ann_index(path: str) -> Optional[Tuple[Any, List[str]]]:
+    """Return a cached FAISS index and its case ids, or None if unavailable."""
+    if faiss is None or not os.path.exists(path):
+        return None
+
+    try:
+        index = faiss.read_index(path)
+        with open(_ann_ids_path(path), encoding="utf-8") as handle:
+            identifiers = json.load(handle)
+    except (OSError, RuntimeError, ValueError):
+        # Unreadable index or missing/corrupt id file: use text search.
+        return None
+    if not isinstance(identifiers, list) or len(identifiers) != index.ntotal:
+        return None
+
+    if hasattr(index, "nprobe"):
+        index.nprobe = ANN_NPROBE
+    return index, identifiers
+
+
+def _is_literal_query(query: str) -> bool:
+    """Return True for quoted phrases and citation-shaped queries."""
+    stripped = query.strip()
+    if len(stripped) > 1 and stripped[0] == stripped[-1] == '"':
+        return True
+    return CITATION_PATTERN.fullmatch(stripped) is not None
+
+
+def _content_hash(content: Union[str, bytes]) -> bytes:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def _quantize(vectors: np.ndarray) -> np.ndarray:
+    """Scalar-quantise normalised embeddings to int8 codes."""
+    return np.clip(np.round(vectors * QUANTIZATION_SCALE), -128, 127).astype(np.int8)
+
+
+def _score_documents(document_vectors: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+    """Return cosine scores of int8 document codes against a float32 query.
+
+    The codes are widened to a C-contiguous float32 matrix so ``np.dot``
+    dispatches to BLAS ``sgemv``; NumPy's integer matmul has no BLAS path.
+    """
+    matrix = np.ascontiguousarray(document_vectors, dtype=np.float32)
+    query = np.ascontiguousarray(query_vector, dtype=np.float32)
+    scores = np.empty(len(matrix), dtype=np.float32)
+    np.dot(matrix, query, out=scores)
+    scores *= 1.0 / QUANTIZATION_SCALE
+    return scores
+
+
+@lru_cache(maxsize=1)
+def _get_topk_kernel():
+    """Return the compiled top-k kernel, or None without numba.
+
+    numba is imported on first use because it adds noticeably to start-up.
+    """
+    try:  # Optional: compiled top-k kernel for large candidate sets.
+        from numba import njit, prange
+    except ImportError:  # pragma: no cover - depends on installed extras
+        return None
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _topk_dot_i8(document_codes, query_codes, k):  # pragma: no cover - compiled
+        rows, dims = document_codes.shape
+        scores = np.empty(rows, dtype=np.int32)
+        for row in prange(rows):
+            total = np.int32(0)
+            for dim in range(dims):
+                total += np.int32(document_codes[row, dim]) * np.int32(query_codes[dim])
+            scores[row] = total
+
+        # Insertion into a k-sized sorted buffer; ties keep the earlier row.
+        top_rows = np.full(k, -1, dtype=np.int64)
+        top_scores = np.full(k, -(2**31), dtype=np.int32)
+        for row in range(rows):
+            score = scores[row]
+            if score <= top_scores[k - 1]:
+                continue
+            position = k - 1
+            while position > 0 and top_scores[position - 1] < score:
+                top_scores[position] = top_scores[position - 1]
+                top_rows[position] = top_rows[position - 1]
+                position -= 1
+            top_scores[position] = score
+            top_rows[position] = row
+        return top_rows, top_scores
+
+    return _topk_dot_i8
+
+
+def _top_k_scores(
+    document_vectors: np.ndarray, query_vector: np.ndarray, k: int
+) -> Tuple[List[int], List[float]]:
+    """Return the indices and scores of the ``k`` best documents, best first."""
+    k = min(k, len(document_vectors))
+    if k <= 0:
+        return [], []
+
+    kernel = _get_topk_kernel() if len(document_vectors) >= TOPK_KERNEL_MIN_CANDIDATES else None
+    if kernel is not None:
+        rows, scores = kernel(
+            np.ascontiguousarray(document_vectors, dtype=np.int8),
+            _quantize(query_vector),
+            k,
+        )
+        return rows.tolist(), (scores / QUANTIZATION_SCALE**2).tolist()
+
+    scores = _score_documents(document_vectors, query_vector)
+    indices = np.argsort(-scores, kind="stable")[:k]
+    return indices.tolist(), scores[indices].tolist()
+
+
+def _encode_texts(texts: List[str]) -> np.ndarray:
+    """Encode texts in length buckets and return vectors in input order."""
+    model = _get_embedding_model()
+    max_length = model.max_seq_length or 512
+    lengths = [min(len(text.split()), max_length) for text in texts]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    buckets: List[List[int]] = []
+    for index in order:
+        if buckets and (
+            len(buckets[-1]) < MIN_LENGTH_BUCKET_SIZE
+            or lengths[index] <= LENGTH_BUCKET_RATIO * max(lengths[buckets[-1][0]], 1)
+        ):
+            buckets[-1].append(index)
+        else:
+            buckets.append([index])
+
+    vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+    for bucket in buckets:
+        encoded = _embed_batch(model, [texts[index] for index in bucket])
+        for index, vector in zip(bucket, encoded):
+            vectors[index] = vector
+    return np.stack(vectors)
+
+
+def _embed_batch(model: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    """Return normalised embeddings for one padded batch of texts.
+
+    Mean-pooling models are run directly: the fast (Rust) tokenizer encodes
+    the whole batch in one call and the transformer output is pooled here,
+    bypassing the per-call bookkeeping of ``SentenceTransformer.encode``.
+    """
+    if not _supports_direct_forward(model):
+        return model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+
+    features = model.tokenizer(
+        texts,
+        padding=True,
+        truncation=True,
+        max_length=model.max_seq_length,
+        return_tensors="pt",
+    ).to(model.device)
+    with torch.inference_mode():
+        hidden = model[0].auto_model(**features).last_hidden_state
+        mask = features["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+        pooled = torch.nn.functional.normalize(pooled.float(), dim=1)
+    return pooled.cpu().numpy()
+
+
+@lru_cache(maxsize=1)
+def _supports_direct_forward(model: SentenceTransformer) -> bool:
+    if len(model) < 2 or not getattr(model.tokenizer, "is_fast", False):
+        return False
+    pooling = model[1]
+    # sentence-transformers 5+ exposes the mode directly; older releases
+    # only through get_pooling_mode_str().
+    pooling_mode = getattr(pooling, "pooling_mode", None)
+    if pooling_mode is None and hasattr(pooling, "get_pooling_mode_str"):
+        pooling_mode = pooling.get_pooling_mode_str()
+    return pooling_mode == "mean"
+
+
+def _encode_query(query: str) -> np.ndarray:
+    """Return the float32 embedding for a query, memoised by content hash."""
+    key = _content_hash(query)
+    vector = _query_vector_cache.get(key)
+    if vector is None:
+        vector = _encode_texts([query])[0]
+        _query_vector_cache.put(key, vector)
+    return vector
+
+
+def _encode_documents(texts: List[str], keys: List[bytes]) -> np.ndarray:
+    """Return int8 document embeddings, encoding only cache misses."""
+    vectors: List[Optional[np.ndarray]] = [_document_vector_cache.get(key) for key in keys]
+    missing = [index for index, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        encoded = _encode_texts([texts[index] for index in missing])
+        for index, vector in zip(missing, _quantize(encoded)):
+            _document_vector_cache.put(keys[index], vector)
+            vectors[index] = vector
+
+    return np.stack(vectors)
+
+
+@lru_cache(maxsize=1)
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the worker pool used to overlap query encoding with MongoDB I/O."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="embedding")
@@ -0,0 +1,276 @@
+"""Tests for the pure query helpers in db.py."""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pytest
+
+import db
+from sample_data import SAMPLE_CASES
+
+
+class _Cursor:
+    def __init__(self, documents):
+        self._documents = documents
+
+    def to_list(self, length):
+        return list(self._documents)[:length]
+
+
+class _Collection:
+    def __init__(self, documents):
+        self._documents = documents
+
+    def find(self, *args, **kwargs):
+        return _Cursor(self._documents)
+
+
+def _repository(documents=()):
+    repository = db.MongoCaseRepository(uri="mongodb://test", database="law", collection="cases")
+    repository._collection = _Collection(documents)
+    return repository
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "2023 0 CJ(SC) 242",
+        "(2019) 5 SCC 1",
+        '"undue influence"',
+        '  "purposive interpretation"  ',
+    ],
+)
+def test_literal_queries_are_detected(query):
+    assert db._is_literal_query(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Article 21 (right to life)",
+        "section 498A (cruelty) dowry",
+        "Section 102(1)(ca) election",
+        "non-disclosure of a minor conviction",
+        "M.R. Shah",
+        '"',
+    ],
+)
+def test_topical_queries_are_not_literal(query):
+    assert not db._is_literal_query(query)
+
+
+@pytest.mark.parametrize("query", ["M.R. Shah", "c.t. ravikumar"])
+def test_exact_match_on_bench_or_citation(query):
+    assert _repository()._is_exact_match(query, SAMPLE_CASES)
+
+
+@pytest.mark.parametrize("query", ["Shah", "Kerala Police Act", "M.R. Shah election law"])
+def test_no_exact_match_for_partial_or_long_queries(query):
+    assert not _repository()._is_exact_match(query, SAMPLE_CASES)
+
+
+def test_name_lookup_does_not_encode_query(monkeypatch):
+    documents = [dict(case, _id=str(index)) for index, case in enumerate(SAMPLE_CASES * 2)]
+    encoded = []
+    monkeypatch.setattr(db, "_encode_query", encoded.append)
+
+    results = _repository(documents).search_cases("M.R. Shah")
+
+    assert [case["_id"] for case in results] == ["0", "1"]
+    db._get_executor().submit(lambda: None).result()
+    assert encoded == []
+
+
+def test_single_result_is_returned_without_encoding(monkeypatch):
+    encoded = []
+    monkeypatch.setattr(db, "_encode_query", encoded.append)
+
+    results = _repository([dict(SAMPLE_CASES[0], _id="0")]).search_cases("dowry death")
+
+    assert [case["_id"] for case in results] == ["0"]
+    db._get_executor().submit(lambda: None).result()
+    assert encoded == []
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [("M.R. Shah", ["0", "1"]), ("dowry death", ["ann"]), ("Kerala Police Act", ["ann"])],
+)
+def test_short_topical_queries_use_ann_index(monkeypatch, query, expected):
+    documents = [dict(case, _id=str(index)) for index, case in enumerate(SAMPLE_CASES * 2)]
+    repository = _repository(documents)
+    repository.ann_index_path = "cases.faiss"
+    monkeypatch.setattr(db, "_load_ann_index", lambda path: object())
+    monkeypatch.setattr(repository, "_ann_search", lambda *args: [{"_id": "ann"}])
+
+    assert [case["_id"] for case in repository.search_cases(query)] == expected
+
+
+def _write_flat_index(path, rows):
+    faiss = pytest.importorskip("faiss")
+    index = faiss.IndexFlatIP(8)
+    index.add(np.eye(rows, 8, dtype=np.float32))
+    faiss.write_index(index, str(path))
+
+
+def test_ann_index_without_id_file_is_ignored(tmp_path):
+    path = tmp_path / "cases.faiss"
+    _write_flat_index(path, 3)
+
+    assert db._load_ann_index(str(path)) is None
+
+
+def test_ann_index_with_mismatched_ids_is_ignored(tmp_path):
+    path = tmp_path / "cases.faiss"
+    _write_flat_index(path, 3)
+    (tmp_path / "cases.faiss.ids.json").write_text('["a", "b"]', encoding="utf-8")
+
+    assert db._load_ann_index(str(path)) is None
+
+
+def test_ann_search_with_other_dimension_falls_back(tmp_path, monkeypatch):
+    path = tmp_path / "cases.faiss"
+    _write_flat_index(path, 2)
+    (tmp_path / "cases.faiss.ids.json").write_text('["a", "b"]', encoding="utf-8")
+    ann_index = db._load_ann_index(str(path))
+    monkeypatch.setattr(db, "_encode_query", lambda query: np.ones(384, dtype=np.float32))
+
+    repository = _repository()
+    assert ann_index is not None
+    assert repository._ann_search(repository._collection, "query", ann_index) is None
+
+
+def test_direct_forward_matches_encode(tmp_path):
+    import transformers
+    from sentence_transformers import SentenceTransformer
+
+    try:
+        from sentence_transformers.sentence_transformer import modules
+    except ImportError:  # sentence-transformers < 5
+        from sentence_transformers import models as modules
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *"abcdefghijklmnopqrstuvwxyz.", "shah"]
+    (tmp_path / "vocab.txt").write_text("\n".join(vocab), encoding="utf-8")
+    transformers.BertTokenizerFast(str(tmp_path / "vocab.txt")).save_pretrained(tmp_path)
+    config = transformers.BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=32,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=64,
+    )
+    transformers.BertModel(config).save_pretrained(tmp_path)
+    model = SentenceTransformer(
+        modules=[
+            modules.Transformer(str(tmp_path), max_seq_length=64),
+            modules.Pooling(32, "mean"),
+            modules.Normalize(),
+        ],
+        device="cpu",
+    )
+    texts = ["m.r. shah", "election law and disclosure " * 8, "a"]
+
+    assert db._supports_direct_forward(model)
+    np.testing.assert_allclose(
+        db._embed_batch(model, texts),
+        model.encode(texts, convert_to_numpy=True, normalize_embeddings=True),
+        atol=1e-5,
+    )
+
+
+@pytest.mark.parametrize("rows, k", [(16, 5), (200, 30), (40, 40)])
+def test_topk_kernel_matches_argsort(rows, k):
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(rows)
+    document_codes = rng.integers(-128, 128, size=(rows, 384), dtype=np.int8)
+    # A duplicated row forces a tie, which must keep the earlier row first.
+    document_codes[rows // 2] = document_codes[0]
+    query_codes = rng.integers(-128, 128, size=384, dtype=np.int8)
+
+    kernel = db._get_topk_kernel()
+    top_rows, top_scores = kernel(document_codes, query_codes, k)
+
+    scores = document_codes.astype(np.int64) @ query_codes.astype(np.int64)
+    expected = np.argsort(-scores, kind="stable")[:k]
+    assert top_rows.tolist() == expected.tolist()
+    assert top_scores.tolist() == scores[expected].tolist()
+
+
+def test_top_k_scores_orders_best_first():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(24, 384)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    document_codes = db._quantize(vectors)
+
+    indices, scores = db._top_k_scores(document_codes, vectors[7], 5)
+
+    assert indices[0] == 7
+    assert scores == sorted(scores, reverse=True)
+    assert len(indices) == 5
+
+
+def test_ttl_cache_evicts_expired_then_oldest(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(db.time, "monotonic", lambda: clock[0])
+    cache = db._TTLCache(ttl=10, maxsize=3)
+    for key in "abc":
+        cache.put(key, key)
+        clock[0] += 1
+
+    cache.put("a", "A")  # Refreshing moves "a" to the back of the expiry order.
+    cache.put("d", "d")
+    assert [cache.get(key) for key in "abcd"] == ["A", None, "c", "d"]
+
+    clock[0] = 30
+    cache.put("e", "e")
+    assert list(cache._entries) == ["e"]
+
+
+def test_repeat_rerank_skips_detail_fetch(monkeypatch):
+    from concurrent.futures import Future
+
+    rng = np.random.default_rng(1)
+    documents = [{"_id": f"case-{index}", "case_title": f"Case {index}"} for index in range(3)]
+    monkeypatch.setattr(
+        db,
+        "_encode_documents",
+        lambda texts, keys: rng.integers(-127, 128, size=(len(texts), 384), dtype=np.int8),
+    )
+    query_vector = Future()
+    query_vector.set_result(np.ones(384, dtype=np.float32) / np.sqrt(384))
+    repository = _repository()
+    fetched = []
+    monkeypatch.setattr(repository, "_get_case_details", lambda ids: fetched.append(ids) or {})
+
+    first = repository._semantic_rerank("bail", documents, [None] * 3, query_vector)
+    # Even with the text memo evicted, cached scores need no detail fetch.
+    monkeypatch.setattr(db, "_document_text_cache", db._LRUCache(10))
+    second = repository._semantic_rerank("bail", documents, [None] * 3, query_vector)
+
+    assert fetched == [["case-0", "case-1", "case-2"]]
+    assert [case["_id"] for case in second] == [case["_id"] for case in first]
+
+
+def test_concurrent_cold_start_loads_model_once(monkeypatch):
+    import threading
+
+    loads = []
+    barrier = threading.Barrier(2)
+
+    def load():
+        loads.append(object())
+        time.sleep(0.05)
+        return loads[-1]
+
+    def get_model():
+        barrier.wait()
+        return db._get_embedding_model()
+
+    monkeypatch.setattr(db, "_embedding_model", None)
+    monkeypatch.setattr(db, "_load_embedding_model", load)
+    worker = db._get_executor().submit(get_model)
+    model = get_model()
+
+    assert worker.result() is model
+    assert len(loads) == 1